@@ -14,10 +14,13 @@ Architecture : Agentic Loop = CCTP → Plan d'exécution → Appels sous-traitan
 Usage:
     python agent_travaux_src.py
     python agent_travaux_src.py --task "Calcule le volume d'un bassin de 50x20x3m"
-    python agent_travaux_src.py --model claude-haiku-4-5-20251001 --max-iterations 5
+    python agent_travaux_src.py --model claude-sonnet-4-6 --dispatch-model claude-haiku-4-5
+    python agent_travaux_src.py --batch-file missions.jsonl
+    python agent_travaux_src.py --max-iterations 5
 
 Requirements:
     pip install anthropic python-dotenv
+    pip install orjson  # optionnel, accélère la sérialisation JSON
 
 Author: Vlad / SRC Dunkerque
 Date: 2026-02-19
@@ -25,17 +28,59 @@ Python: 3.11+
 """
 
 import argparse
+import asyncio
+import functools
 import json
 import logging
 import math
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any
 
 import anthropic
 from dotenv import load_dotenv
 
+# Sérialisation JSON du chemin chaud : orjson (C/SIMD) si disponible,
+# repli stdlib sinon — comme louer une pelle 20t quand elle est au parc,
+# sinon on fait le travail à la mini-pelle.
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        """Sérialise en JSON UTF-8 via orjson (pas d'ensure_ascii nécessaire)."""
+        return orjson.dumps(obj).decode()
+
+    def _json_dumps_canonique(obj: Any) -> str:
+        """Sérialise en JSON canonique (clés triées) via orjson."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+except ImportError:
+
+    def _json_dumps(obj: Any) -> str:
+        """Sérialise en JSON UTF-8 via la stdlib (repli sans orjson)."""
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _json_dumps_canonique(obj: Any) -> str:
+        """Sérialise en JSON canonique (clés triées) via la stdlib."""
+        return json.dumps(obj, sort_keys=True)
+
+
+class _JsonLazy:
+    """Enveloppe paresseuse : ne sérialise l'objet que si le log est émis."""
+
+    __slots__ = ("_obj",)
+
+    def __init__(self, obj: Any) -> None:
+        self._obj = obj
+
+    def __str__(self) -> str:
+        return _json_dumps(self._obj)
+
+
 # ─────────────────────────────────────────────
 # CONFIGURATION LOGGING
 # ─────────────────────────────────────────────
@@ -57,7 +102,7 @@ load_dotenv()  # Charge ANTHROPIC_API_KEY depuis .env si présent
 # ═══════════════════════════════════════════════════════════════
 
 # Schéma JSON des outils — le modèle les lit pour savoir quoi appeler
-TOOLS: list[dict] = [
+TOOLS: tuple[dict, ...] = (
     {
         "name": "calculer_volume",
         "description": (
@@ -118,7 +163,76 @@ TOOLS: list[dict] = [
             "required": ["cle", "valeur"],
         },
     },
-]
+    {
+        "name": "lire_memo",
+        "description": (
+            "Relit une note du journal de chantier par sa clé. "
+            "Analogie : rouvrir le carnet à la bonne page. "
+            "À utiliser pour récupérer une note mémorisée au lieu de la redemander."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "cle": {"type": "string", "description": "Identifiant de la note à relire"},
+            },
+            "required": ["cle"],
+        },
+        # Point de cache : tout le préfixe (schémas d'outils) est mis en cache
+        # côté API — comme un DCE déjà imprimé qu'on ne refait pas à chaque réunion.
+        "cache_control": {"type": "ephemeral"},
+    },
+)
+
+# Schéma sérialisé une seule fois à l'import : le contenu est figé (tuple),
+# inutile de re-sérialiser la même structure à chaque tour pour les logs.
+_TOOLS_JSON: str = _json_dumps(list(TOOLS))
+
+# Mots-clés de mission → outil : sélection déterministe des schémas à envoyer
+# (memo_chantier et lire_memo sont toujours de la partie, c'est le carnet du CdT)
+_MOTS_CLES_OUTILS: dict[str, tuple[str, ...]] = {
+    "calculer_volume": (
+        "volume", "bassin", "m³", "m3", "cubature", "cube",
+        "excavation", "terrassement", "déblai", "remblai",
+    ),
+    "estimer_cout_reseau": (
+        "réseau", "reseau", "canalisation", "dn", "assainissement",
+        "pluvial", "eau potable", "telecom", "télécom", "linéaire",
+    ),
+}
+
+
+def select_tools(task: str) -> list[dict]:
+    """
+    Sélectionne les schémas d'outils pertinents pour une mission.
+
+    Analogie BTP : on ne convoque pas tous les sous-traitants à chaque
+    réunion — seuls ceux dont le lot est au planning. Chaque schéma envoyé
+    coûte des tokens d'entrée à chaque itération de la boucle.
+
+    Sélection par mots-clés, volontairement déterministe : pour un
+    catalogue de cette taille, une classification par modèle coûterait
+    plus qu'elle ne rapporte. Les outils du journal (memo_chantier,
+    lire_memo) sont toujours inclus, et comme lire_memo reste le dernier
+    de la liste, le point de cache posé sur son schéma couvre tout le
+    préfixe quel que soit le sous-ensemble retenu.
+
+    Args:
+        task: La mission utilisateur
+
+    Returns:
+        Sous-ensemble de TOOLS à passer en tools= (liste complète si
+        la mission ne matche aucun mot-clé, pour ne rien interdire)
+    """
+    mission = task.lower()
+    retenus = [
+        outil for outil in TOOLS
+        if outil["name"] not in _MOTS_CLES_OUTILS
+        or any(mot in mission for mot in _MOTS_CLES_OUTILS[outil["name"]])
+    ]
+    if all(outil["name"] not in _MOTS_CLES_OUTILS for outil in retenus):
+        # Mission ambiguë (aucun mot-clé métier) : on envoie tout le catalogue
+        return list(TOOLS)
+    return retenus
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -129,6 +243,30 @@ TOOLS: list[dict] = [
 # Journal de chantier partagé pour la session (mémoire de l'agent)
 _journal_chantier: dict[str, str] = {}
 
+# Verrou du journal : les outils s'exécutent désormais en parallèle,
+# un seul sous-traitant écrit dans le carnet à la fois.
+_verrou_journal = threading.Lock()
+
+# Équipe de sous-traitants : exécute en parallèle les tool_use indépendants
+# d'une même itération (utile surtout quand les outils feront de l'I/O).
+_POOL_OUTILS = ThreadPoolExecutor(max_workers=8, thread_name_prefix="outil")
+
+# Garde-fou de débit : 40 requêtes API simultanées maximum, pour rester
+# sous la limite Tier-1 (40 req/min) quand plusieurs agents tournent
+# sur la même boucle d'événements. Un sémaphore asyncio se lie à la boucle
+# qui l'utilise en premier : on en garde un par boucle pour que des
+# asyncio.run successifs dans le même process ne se marchent pas dessus.
+_semaphores_api: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+def _semaphore_api() -> asyncio.Semaphore:
+    """Renvoie le sémaphore API de la boucle d'événements courante."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores_api.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores_api[loop] = asyncio.Semaphore(40)
+    return semaphore
+
 # Densités par matériau (t/m³)
 _DENSITES: dict[str, float] = {
     "terre":   1.8,
@@ -145,6 +283,16 @@ _COUTS_RESEAU: dict[str, list[float]] = {
     "telecom":         [80, 180],
 }
 
+# Coefficients diamètre précalculés pour les DN du commerce —
+# math.sqrt ne sert plus que pour un diamètre hors catalogue.
+_DIAM_COEFF: dict[float, float] = {
+    d: math.sqrt(d / 200) for d in (100, 150, 200, 250, 300, 400, 500, 600, 800, 1000)
+}
+
+# Table de translation virgule → espace (séparateur de milliers à la française),
+# construite une fois au lieu d'un .replace() par appel.
+_SEP_MILLIERS = str.maketrans({",": " "})
+
 
 def calculer_volume(longueur_m: float, largeur_m: float,
                     profondeur_m: float, materiau: str = "terre") -> dict:
@@ -173,7 +321,7 @@ def estimer_cout_reseau(type_reseau: str, longueur_m: float,
     fourchette = _COUTS_RESEAU.get(type_reseau, [200, 500])
 
     # Coefficient diamètre : plus gros = plus cher (loi quadratique simplifiée)
-    coeff_diam = math.sqrt(diametre_mm / 200)
+    coeff_diam = _DIAM_COEFF.get(diametre_mm) or math.sqrt(diametre_mm / 200)
     cout_min = round(fourchette[0] * longueur_m * coeff_diam)
     cout_max = round(fourchette[1] * longueur_m * coeff_diam)
 
@@ -181,8 +329,8 @@ def estimer_cout_reseau(type_reseau: str, longueur_m: float,
         "type_reseau":  type_reseau,
         "longueur_m":   longueur_m,
         "diametre_mm":  diametre_mm,
-        "cout_min_ht":  f"{cout_min:,} €HT".replace(",", " "),
-        "cout_max_ht":  f"{cout_max:,} €HT".replace(",", " "),
+        "cout_min_ht":  f"{cout_min:,} €HT".translate(_SEP_MILLIERS),
+        "cout_max_ht":  f"{cout_max:,} €HT".translate(_SEP_MILLIERS),
         "note":         "Fourniture et pose, hors VRD et déviations",
     }
 
@@ -192,28 +340,78 @@ def memo_chantier(cle: str, valeur: str) -> dict:
     Stocke une information dans le journal de session.
     Analogie : noter dans le carnet de chantier.
     """
-    _journal_chantier[cle] = valeur
-    logger.info(f"📓 Journal chantier — '{cle}' mémorisé")
+    with _verrou_journal:
+        _journal_chantier[cle] = valeur
+        taille = len(_journal_chantier)
+    logger.info("📓 Journal chantier — '%s' mémorisé", cle)
+    # Accusé de réception compact : renvoyer tout le journal ferait grossir
+    # chaque tool_result avec la session (coût en tokens quadratique) —
+    # le modèle relit une note via lire_memo s'il en a besoin.
     return {
-        "status":  "mémorisé",
-        "cle":     cle,
-        "journal": _journal_chantier,
+        "status":         "mémorisé",
+        "cle":            cle,
+        "taille_journal": taille,
     }
 
 
+def lire_memo(cle: str) -> dict:
+    """
+    Relit une note du journal de session.
+    Analogie : rouvrir le carnet de chantier à la bonne page.
+    """
+    with _verrou_journal:
+        if cle not in _journal_chantier:
+            return {
+                "erreur":           f"Clé inconnue : {cle}",
+                "cles_disponibles": list(_journal_chantier),
+            }
+        return {"cle": cle, "valeur": _journal_chantier[cle]}
+
+
 # Registre des outils : nom → fonction Python
 _TOOL_REGISTRY: dict[str, Any] = {
     "calculer_volume":    calculer_volume,
     "estimer_cout_reseau": estimer_cout_reseau,
     "memo_chantier":      memo_chantier,
+    "lire_memo":          lire_memo,
 }
 
 
+# Outils qui touchent l'état de session : jamais mémoïsés (rejouer un
+# memo_chantier doit réellement écrire, et une lecture du journal doit
+# refléter son contenu du moment, pas celui du premier appel).
+_OUTILS_SANS_CACHE: frozenset[str] = frozenset({"memo_chantier", "lire_memo"})
+
+
+@functools.lru_cache(maxsize=256)
+def _executer_outil_memoise(tool_name: str, entree_canonique: str) -> str:
+    """
+    Exécute un outil pur et mémoïse son résultat sérialisé.
+
+    Analogie BTP : le métré déjà fait — si le CdT redemande le même cubage
+    avec les mêmes cotes, on ressort la fiche du classeur au lieu de
+    renvoyer le géomètre sur le terrain.
+
+    Args:
+        tool_name:        Nom de l'outil (doit exister dans _TOOL_REGISTRY)
+        entree_canonique: Paramètres en JSON canonique (clés triées)
+
+    Returns:
+        Résultat sérialisé en JSON string
+    """
+    fn = _TOOL_REGISTRY[tool_name]
+    resultat = fn(**json.loads(entree_canonique))
+    return _json_dumps(resultat)
+
+
 def executer_outil(tool_name: str, tool_input: dict) -> str:
     """
     Dispatch : reçoit l'appel outil du modèle, exécute la bonne fonction.
     Analogie BTP : le dispatcher du chantier qui envoie la bonne équipe.
 
+    Les outils purs (calculs) passent par un cache LRU : le modèle re-demande
+    souvent le même calcul au fil d'un plan multi-étapes, inutile de le refaire.
+
     Args:
         tool_name:  Nom de l'outil demandé par le modèle
         tool_input: Paramètres fournis par le modèle
@@ -222,17 +420,151 @@ def executer_outil(tool_name: str, tool_input: dict) -> str:
         Résultat sérialisé en JSON string (pour renvoi au modèle)
     """
     if tool_name not in _TOOL_REGISTRY:
-        return json.dumps({"erreur": f"Outil inconnu : {tool_name}"})
+        return _json_dumps({"erreur": f"Outil inconnu : {tool_name}"})
 
     try:
-        fn = _TOOL_REGISTRY[tool_name]
-        resultat = fn(**tool_input)
-        logger.info(f"🔧 Outil '{tool_name}' exécuté → {resultat}")
-        return json.dumps(resultat, ensure_ascii=False)
+        if tool_name in _OUTILS_SANS_CACHE:
+            resultat_str = _json_dumps(_TOOL_REGISTRY[tool_name](**tool_input))
+        else:
+            entree_canonique = _json_dumps_canonique(tool_input)
+            resultat_str = _executer_outil_memoise(tool_name, entree_canonique)
+        logger.info("🔧 Outil '%s' exécuté → %s", tool_name, resultat_str)
+        return resultat_str
     except Exception as e:
         erreur = {"erreur": str(e), "outil": tool_name, "input": tool_input}
-        logger.error(f"❌ Erreur outil '{tool_name}' : {e}")
-        return json.dumps(erreur)
+        logger.error("❌ Erreur outil '%s' : %s", tool_name, e)
+        return _json_dumps(erreur)
+
+
+# System prompt : identité et instructions de l'agent.
+# Forme liste + cache_control : le prompt est identique à chaque itération,
+# autant le servir depuis le cache de préfixe plutôt que le re-facturer.
+_SYSTEM_PROMPT: list[dict] = [
+    {
+        "type": "text",
+        "text": """Tu es un assistant expert en travaux publics et ingénierie TP.
+Tu aides à calculer des volumes, estimer des coûts de réseaux et synthétiser des analyses chantier.
+Utilise les outils disponibles pour répondre avec précision.
+Mémorise les résultats importants dans le journal de chantier.
+Réponds en français, de manière professionnelle et structurée.
+Termine toujours par un récapitulatif clair des résultats.""",
+        "cache_control": {"type": "ephemeral"},
+    }
+]
+
+
+# Nombre de tours (paire tool_use/tool_result) gardés mot pour mot ;
+# au-delà, les vieux tours sont condensés en résumé (mémoire à deux niveaux).
+_TOURS_VERBATIM = 3
+
+
+async def _resumer_anciens_tours(client: anthropic.AsyncAnthropic, anciens: list[dict],
+                                 summary_model: str) -> str:
+    """
+    Condense les vieux tours de conversation en un court résumé texte.
+
+    Analogie BTP : les comptes-rendus des réunions passées ne sont pas relus
+    in extenso à chaque réunion — on garde le relevé de décisions.
+
+    Args:
+        client:        Client Anthropic (réutilisé pour l'appel de résumé)
+        anciens:       Tranche de messages à condenser
+        summary_model: Modèle économique chargé du résumé
+
+    Returns:
+        Résumé en quelques phrases des étapes abandonnées
+    """
+    lignes: list[str] = []
+    for message in anciens:
+        contenu = message["content"]
+        if isinstance(contenu, str):
+            lignes.append(f"[{message['role']}] {contenu}")
+            continue
+        for bloc in contenu:
+            btype = bloc.get("type") if isinstance(bloc, dict) else bloc.type
+            if btype == "text":
+                texte = bloc.get("text", "") if isinstance(bloc, dict) else bloc.text
+                lignes.append(f"[{message['role']}] {texte}")
+            elif btype == "tool_use":
+                nom = bloc["name"] if isinstance(bloc, dict) else bloc.name
+                entree = bloc["input"] if isinstance(bloc, dict) else bloc.input
+                lignes.append(f"[outil] {nom}({_json_dumps(entree)})")
+            elif btype == "tool_result":
+                resultat = bloc.get("content", "") if isinstance(bloc, dict) else ""
+                lignes.append(f"[résultat] {resultat}")
+
+    async with _semaphore_api():
+        reponse = await client.messages.create(
+            model=summary_model,
+            max_tokens=500,
+            messages=[{
+                "role": "user",
+                "content": (
+                    "Résume en quelques phrases les étapes de travail suivantes "
+                    "(calculs effectués, résultats obtenus, notes mémorisées), "
+                    "en conservant toutes les valeurs chiffrées :\n\n"
+                    + "\n".join(lignes)
+                ),
+            }],
+        )
+    return reponse.content[0].text
+
+
+async def _compacter_historique(client: anthropic.AsyncAnthropic, messages: list[dict],
+                                summary_model: str) -> list[dict]:
+    """
+    Borne la taille de l'historique : résumé des vieux tours + K tours verbatim.
+
+    Sans compaction, chaque itération renvoie tout l'historique — trafic de
+    tokens en O(itération²) sur les longs plans. On garde la mission initiale,
+    un résumé des tours anciens, et les _TOURS_VERBATIM derniers tours intacts
+    (la dernière paire tool_use/tool_result doit rester appariée par ID).
+
+    Args:
+        client:        Client Anthropic pour l'appel de résumé
+        messages:      Historique complet de la conversation
+        summary_model: Modèle économique chargé du résumé
+
+    Returns:
+        Historique compacté (ou l'original s'il est encore court)
+    """
+    garde = 2 * _TOURS_VERBATIM
+    if len(messages) <= 1 + garde:
+        return messages
+
+    anciens = messages[1:-garde]
+    resume = await _resumer_anciens_tours(client, anciens, summary_model)
+    logger.info("🗜️  Historique compacté — %d messages → résumé", len(anciens))
+
+    return [
+        messages[0],
+        {"role": "user",
+         "content": f"Résumé des étapes précédentes : {resume}"},
+        *messages[-garde:],
+    ]
+
+
+def _marquer_point_de_cache(messages: list[dict]) -> None:
+    """
+    Déplace le point de cache incrémental sur le dernier message de l'historique.
+
+    Analogie BTP : on tamponne la dernière page du journal de chantier —
+    tout ce qui précède le tampon est déjà archivé (cache de préfixe API),
+    seules les pages suivantes seront relues en entier.
+
+    Args:
+        messages: Historique de conversation (modifié en place)
+    """
+    for message in messages:
+        contenu = message["content"]
+        if isinstance(contenu, list):
+            for bloc in contenu:
+                if isinstance(bloc, dict):
+                    bloc.pop("cache_control", None)
+
+    dernier = messages[-1]["content"]
+    if isinstance(dernier, list) and dernier and isinstance(dernier[-1], dict):
+        dernier[-1]["cache_control"] = {"type": "ephemeral"}
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -241,11 +573,13 @@ def executer_outil(tool_name: str, tool_input: dict) -> str:
 # jusqu'à ce que tout soit validé.
 # ═══════════════════════════════════════════════════════════════
 
-def run_agent(
+async def run_agent(
     task: str,
-    model: str = "claude-sonnet-4-6",
+    dispatch_model: str = "claude-haiku-4-5",
+    synthesis_model: str = "claude-sonnet-4-6",
     max_iterations: int = 10,
     verbose: bool = True,
+    summary_model: str = "claude-haiku-4-5",
 ) -> str:
     """
     Boucle agentique principale.
@@ -262,35 +596,43 @@ def run_agent(
         → Comptes-rendus remontés (tool_result)
         → CdT synthétise → livraison finale (end_turn)
 
+    Routage adaptatif des modèles (cascade) : les tours de dispatch
+    ("quel outil appeler ?") vont au modèle économique, la synthèse finale
+    au modèle haut de gamme. Analogie : le chef d'équipe gère le quotidien,
+    le conducteur de travaux signe le DOE.
+
     Args:
-        task:           La mission à accomplir
-        model:          Modèle Anthropic à utiliser
-        max_iterations: Nombre max d'itérations pour éviter les boucles infinies
-        verbose:        Afficher les détails de la boucle
+        task:            La mission à accomplir
+        dispatch_model:  Modèle économique pour les tours de sélection d'outils
+        synthesis_model: Modèle haut de gamme pour la synthèse finale
+        max_iterations:  Nombre max d'itérations pour éviter les boucles infinies
+        verbose:         Afficher les détails de la boucle
+        summary_model:   Modèle économique utilisé pour compacter l'historique
 
     Returns:
         Réponse finale de l'agent (texte)
     """
-    client = anthropic.Anthropic()  # Lit ANTHROPIC_API_KEY depuis l'env
+    client = anthropic.AsyncAnthropic()  # Lit ANTHROPIC_API_KEY depuis l'env
+    system_prompt = _SYSTEM_PROMPT
 
-    # System prompt : identité et instructions de l'agent
-    system_prompt = """Tu es un assistant expert en travaux publics et ingénierie TP.
-Tu aides à calculer des volumes, estimer des coûts de réseaux et synthétiser des analyses chantier.
-Utilise les outils disponibles pour répondre avec précision.
-Mémorise les résultats importants dans le journal de chantier.
-Réponds en français, de manière professionnelle et structurée.
-Termine toujours par un récapitulatif clair des résultats."""
+    # Seuls les schémas d'outils utiles à la mission partent dans le contexte
+    tools_mission = select_tools(task)
 
     # Historique de la conversation (accumule les tours)
     messages: list[dict] = [
         {"role": "user", "content": task}
     ]
 
-    logger.info(f"🚀 Agent démarré — Modèle : {model}")
-    logger.info(f"📋 Mission : {task[:80]}...")
+    logger.info("🚀 Agent démarré — Dispatch : %s │ Synthèse : %s", dispatch_model, synthesis_model)
+    logger.info("📋 Mission : %.80s...", task)
+    logger.info(
+        "🧰 %d/%d outils retenus pour la mission (%d octets de schéma complet)",
+        len(tools_mission), len(TOOLS), len(_TOOLS_JSON),
+    )
 
     iteration = 0
     reponse_finale = ""
+    forcer_synthese = False  # Passe à True quand la planification est finie
 
     # ── BOUCLE AGENTIQUE ───────────────────────────────────────
     while iteration < max_iterations:
@@ -300,25 +642,70 @@ Termine toujours par un récapitulatif clair des résultats."""
             print(f"  🔄 ITÉRATION {iteration}/{max_iterations}")
             print(f"{'─'*50}")
 
-        # Appel API — on envoie l'historique complet à chaque tour
-        response = client.messages.create(
-            model=model,
-            max_tokens=4096,
-            system=system_prompt,
-            tools=TOOLS,
-            messages=messages,
-        )
+        # Mémoire à deux niveaux : au-delà de _TOURS_VERBATIM tours,
+        # les anciens échanges sont condensés en résumé pour borner
+        # le volume de tokens renvoyé à chaque itération.
+        messages = await _compacter_historique(client, messages, summary_model)
+
+        # Appel API en streaming — on envoie l'historique borné à chaque
+        # tour (préfixe servi depuis le cache grâce aux points posés plus
+        # haut), et on lance chaque outil dès que son bloc tool_use est
+        # complet, sans attendre la fin de la génération. Analogie : le
+        # sous-traitant part sur le chantier dès que son OS est signé,
+        # pas à la fin de la réunion.
+        _marquer_point_de_cache(messages)
+
+        # Cascade de modèles : dispatch économique tant qu'on planifie,
+        # synthèse haut de gamme (sans outils) une fois le plan déroulé.
+        modele_tour = synthesis_model if forcer_synthese else dispatch_model
+        tool_choice = {"type": "none"} if forcer_synthese else {"type": "auto"}
+        if verbose:
+            logger.info("🎛️  Modèle du tour : %s", modele_tour)
+
+        futures_outils: dict[str, Any] = {}
+        soumettre_outil = _POOL_OUTILS.submit  # LOAD_FAST dans les boucles chaudes
+        async with _semaphore_api():
+            async with client.messages.stream(
+                model=modele_tour,
+                max_tokens=4096,
+                system=system_prompt,
+                tools=tools_mission,
+                tool_choice=tool_choice,
+                messages=messages,
+            ) as stream:
+                async for event in stream:
+                    if (event.type == "content_block_stop"
+                            and event.content_block.type == "tool_use"):
+                        bloc = event.content_block
+                        futures_outils[bloc.id] = soumettre_outil(
+                            executer_outil, bloc.name, bloc.input
+                        )
+                response = await stream.get_final_message()
 
         if verbose:
-            logger.info(f"📡 Réponse — stop_reason: {response.stop_reason}")
+            logger.info("📡 Réponse — stop_reason: %s", response.stop_reason)
+            logger.info(
+                "💾 Cache préfixe — lus: %s tokens, écrits: %s tokens",
+                response.usage.cache_read_input_tokens,
+                response.usage.cache_creation_input_tokens,
+            )
+
+        # Un seul passage typé sur les blocs : texte et tool_use triés
+        # en même temps (comparaison de block.type, pas de réflexion
+        # hasattr), les branches ci-dessous consomment les listes prêtes.
+        texte_final = ""
+        tool_blocks = []
+        ajouter_bloc = tool_blocks.append
+        for block in response.content:
+            btype = block.type
+            if btype == "text" and not texte_final:
+                texte_final = block.text
+            elif btype == "tool_use":
+                ajouter_bloc(block)
 
         # ── CAS 1 : Le modèle a terminé (end_turn) ──────────────
         if response.stop_reason == "end_turn":
-            # Extraire le texte final
-            for block in response.content:
-                if hasattr(block, "text"):
-                    reponse_finale = block.text
-                    break
+            reponse_finale = texte_final
 
             print(f"\n{'═'*50}")
             print("  ✅ LIVRAISON FINALE DE L'AGENT")
@@ -339,27 +726,41 @@ Termine toujours par un récapitulatif clair des résultats."""
                 "content": response.content
             })
 
-            # Collecter tous les tool_results de cette itération
+            # Les outils tournent déjà (lancés pendant le streaming) :
+            # on collecte les comptes-rendus dans l'ordre des ordres
+            # de service, en conservant chaque tool_use_id.
+            # Détail des outils : seulement si quelqu'un lit vraiment la
+            # sortie (verbose ET niveau INFO actif) — sinon on ne paie ni
+            # la sérialisation des paramètres ni le formatage.
+            detail_outils = verbose and logger.isEnabledFor(logging.INFO)
+
+            # Pré-liaison en locaux : un accès attribut sur les modèles
+            # Pydantic (descripteurs) coûte bien plus qu'un LOAD_FAST,
+            # sensible quand le modèle émet 10+ tool_use par tour.
             tool_results = []
-
-            for block in response.content:
-                if block.type == "tool_use":
-                    if verbose:
-                        print(f"\n  🔧 Outil demandé : {block.name}")
-                        print(f"     Paramètres   : {json.dumps(block.input, ensure_ascii=False)}")
-
-                    # Exécuter l'outil
-                    result_str = executer_outil(block.name, block.input)
-
-                    if verbose:
-                        print(f"     Résultat     : {result_str}")
-
-                    # Construire le tool_result pour ce tool_use
-                    tool_results.append({
-                        "type":        "tool_result",
-                        "tool_use_id": block.id,
-                        "content":     result_str,
-                    })
+            ajouter_resultat = tool_results.append
+            future_du_bloc = futures_outils.get
+
+            for block in tool_blocks:
+                bname, binput, bid = block.name, block.input, block.id
+                future = future_du_bloc(bid) or soumettre_outil(
+                    executer_outil, bname, binput
+                )
+                if detail_outils:
+                    print(f"\n  🔧 Outil demandé : {bname}")
+                    print(f"     Paramètres   : {_JsonLazy(binput)}")
+
+                result_str = await asyncio.wrap_future(future)
+
+                if detail_outils:
+                    print(f"     Résultat     : {result_str}")
+
+                # Construire le tool_result pour ce tool_use
+                ajouter_resultat({
+                    "type":        "tool_result",
+                    "tool_use_id": bid,
+                    "content":     result_str,
+                })
 
             # Renvoyer tous les résultats d'outils au modèle
             messages.append({
@@ -367,9 +768,14 @@ Termine toujours par un récapitulatif clair des résultats."""
                 "content": tool_results
             })
 
+            # Plus d'indice de planification (le dernier ordre était une
+            # écriture au journal) → le prochain tour est la synthèse finale.
+            if tool_blocks and tool_blocks[-1].name == "memo_chantier":
+                forcer_synthese = True
+
         # ── CAS 3 : Stop inattendu ───────────────────────────────
         else:
-            logger.warning(f"⚠️  Stop inattendu : {response.stop_reason}")
+            logger.warning("⚠️  Stop inattendu : %s", response.stop_reason)
             break
 
     # Sécurité : si on a dépassé max_iterations
@@ -380,6 +786,87 @@ Termine toujours par un récapitulatif clair des résultats."""
     return reponse_finale
 
 
+async def run_many(tasks: list[str], **kwargs: Any) -> list[str]:
+    """
+    Exécute plusieurs agents en concurrence sur la même boucle d'événements.
+
+    Analogie BTP : plusieurs chantiers menés de front par la même agence —
+    pendant qu'un chantier attend son béton (réponse API), les autres
+    avancent. Le sémaphore global borne le débit vers l'API.
+
+    Args:
+        tasks:    Liste de missions, un agent par mission
+        **kwargs: Paramètres transmis tels quels à run_agent
+
+    Returns:
+        Réponses finales, dans l'ordre des missions
+    """
+    return list(await asyncio.gather(*(run_agent(t, **kwargs) for t in tasks)))
+
+
+def run_agent_batch(
+    tasks: list[str],
+    model: str = "claude-sonnet-4-6",
+    poll_interval_s: float = 10.0,
+) -> dict[str, str]:
+    """
+    Soumet plusieurs missions indépendantes via l'API Message Batches.
+
+    Analogie BTP : l'appel d'offres groupé — on envoie les 200 lots d'un
+    coup au lieu de consulter entreprise par entreprise, et le tarif
+    est négocié (-50 % sur les tokens par rapport aux appels unitaires).
+
+    Limite assumée : le batch ne couvre qu'un seul tour de modèle, donc
+    pas d'outils ici — réservé aux missions qui tiennent en une réponse
+    texte (évaluation hors-ligne, cubatures en masse). Les missions qui
+    nécessitent la boucle outillée passent par run_agent.
+
+    Args:
+        tasks:           Liste de missions, une par requête du batch
+        model:           Modèle Anthropic à utiliser pour chaque mission
+        poll_interval_s: Intervalle de sondage du statut du batch (secondes)
+
+    Returns:
+        Dictionnaire custom_id → réponse texte (ou libellé d'erreur)
+    """
+    client = anthropic.Anthropic()
+
+    batch = client.messages.batches.create(
+        requests=[
+            {
+                "custom_id": f"task-{i}",
+                "params": {
+                    "model": model,
+                    "max_tokens": 4096,
+                    "system": _SYSTEM_PROMPT,
+                    "messages": [{"role": "user", "content": t}],
+                },
+            }
+            for i, t in enumerate(tasks)
+        ]
+    )
+    logger.info("📦 Batch '%s' soumis — %d missions", batch.id, len(tasks))
+
+    # Sondage jusqu'à la fin du traitement (le batch est asynchrone côté API)
+    while batch.processing_status != "ended":
+        time.sleep(poll_interval_s)
+        batch = client.messages.batches.retrieve(batch.id)
+        logger.info("⏳ Batch '%s' — statut : %s", batch.id, batch.processing_status)
+
+    resultats: dict[str, str] = {}
+    for entree in client.messages.batches.results(batch.id):
+        if entree.result.type == "succeeded":
+            message = entree.result.message
+            texte = next((b.text for b in message.content if b.type == "text"), "")
+            resultats[entree.custom_id] = texte
+        else:
+            resultats[entree.custom_id] = f"[{entree.result.type}]"
+            logger.warning("⚠️  Mission '%s' — %s", entree.custom_id, entree.result.type)
+
+    logger.info("✅ Batch '%s' terminé — %d résultats", batch.id, len(resultats))
+    return resultats
+
+
 # ═══════════════════════════════════════════════════════════════
 # CLI — Interface ligne de commande
 # ═══════════════════════════════════════════════════════════════
@@ -412,7 +899,13 @@ Exemples :
         "--model",
         type=str,
         default="claude-sonnet-4-6",
-        help="Modèle Anthropic (défaut: claude-sonnet-4-6)",
+        help="Modèle de synthèse finale (défaut: claude-sonnet-4-6)",
+    )
+    parser.add_argument(
+        "--dispatch-model",
+        type=str,
+        default="claude-haiku-4-5",
+        help="Modèle économique des tours de sélection d'outils (défaut: claude-haiku-4-5)",
     )
     parser.add_argument(
         "--max-iterations",
@@ -425,6 +918,15 @@ Exemples :
         action="store_true",
         help="Mode silencieux — affiche uniquement la réponse finale",
     )
+    parser.add_argument(
+        "--batch-file",
+        type=str,
+        default=None,
+        help=(
+            "Fichier JSONL de missions mono-tour (une ligne = {\"task\": ...}) "
+            "soumises via l'API Message Batches (-50 %% sur les tokens)"
+        ),
+    )
     return parser.parse_args()
 
 
@@ -442,17 +944,28 @@ def main() -> int:
 
     print(f"\n{'═'*60}")
     print("  🏗️  AGENT TRAVAUX PUBLICS — SDK ANTHROPIC")
-    print(f"  Modèle : {args.model}")
-    print(f"  Date   : {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print(f"  Modèles : {args.dispatch_model} (dispatch) → {args.model} (synthèse)")
+    print(f"  Date    : {datetime.now().strftime('%Y-%m-%d %H:%M')}")
     print(f"{'═'*60}")
 
     try:
-        run_agent(
+        # Mode batch : missions mono-tour soumises en masse, tarif réduit
+        if args.batch_file:
+            with open(args.batch_file, encoding="utf-8") as f:
+                tasks = [json.loads(ligne)["task"] for ligne in f if ligne.strip()]
+            resultats = run_agent_batch(tasks, model=args.model)
+            for custom_id, texte in resultats.items():
+                print(f"\n── {custom_id} {'─'*40}")
+                print(texte)
+            return 0
+
+        asyncio.run(run_agent(
             task=args.task,
-            model=args.model,
+            dispatch_model=args.dispatch_model,
+            synthesis_model=args.model,
             max_iterations=args.max_iterations,
             verbose=not args.quiet,
-        )
+        ))
         return 0
 
     except anthropic.AuthenticationError:
@@ -462,7 +975,7 @@ def main() -> int:
         logger.error("❌ Rate limit atteint. Attendez quelques secondes.")
         return 1
     except Exception as e:
-        logger.error(f"❌ Erreur inattendue : {e}")
+        logger.error("❌ Erreur inattendue : %s", e)
         return 1
 
 